@@ -1,5 +1,8 @@
+from functools import partial
 from collections.abc import Awaitable
 
+from kivy.event import EventDispatcher
+
 from kivy.core.window import Window, WindowBase
 from kivy.lang import Builder
 from kivy.factory import Factory
@@ -42,10 +45,41 @@ Builder.load_string('''
 PromptPopup = Factory.get('PromptPopup')
 
 
+def _fire_with_index(fire, index, *args):
+    fire(index)
+
+
+async def any_event(*targets: tuple[EventDispatcher, str]) -> Awaitable[int]:
+    '''
+    Waits for any of the given events to occur, and returns the index of the one that did.
+
+    .. code-block::
+
+        index = await any_event((button1, 'on_release'), (button2, 'on_release'))
+
+    Unlike ``ak.wait_any(ak.event(...), ak.event(...))``, this doesn't create a task per event.
+    '''
+    e = ak.ExclusiveEvent()
+    bind_ids = [obj.fbind(name, partial(_fire_with_index, e.fire, i)) for i, (obj, name) in enumerate(targets)]
+    try:
+        return (await e.wait())[0][0]
+    finally:
+        for (obj, name), bind_id in zip(targets, bind_ids):
+            obj.unbind_uid(name, bind_id)
+
+
+_popups: list[PromptPopup] = []
+
+
+def prewarm(n=1):
+    '''Creates ``n`` popups ahead of time so that :func:`ask_input` doesn't have to build one on first use.'''
+    _popups.extend(PromptPopup() for __ in range(n - len(_popups)))
+
+
 async def ask_input(
     message: str, *, window: WindowBase=Window, ok_text='OK', cancel_text='Cancel',
     input_filter=TextInput.input_filter.defaultvalue, input_type=TextInput.input_type.defaultvalue,
-    transition: Transition=FadeTransition(), auto_dismiss=True, _cache=[],
+    transition: Transition=FadeTransition(), auto_dismiss=True, _cache=_popups,
 ) -> Awaitable[None | str]:
     '''
     Asks input using a popup dialog.
@@ -68,12 +102,12 @@ async def ask_input(
         ti.input_type = input_type
         ti.focus = True
         async with open(popup, window=window, auto_dismiss=auto_dismiss, transition=transition) as ad_event:
-            tasks = await ak.wait_any(
-                ak.event(ti, 'on_text_validate'),
-                ak.event(ids.ok_button, 'on_release'),
-                ak.event(ids.cancel_button, 'on_release'),
+            index = await any_event(
+                (ti, 'on_text_validate'),
+                (ids.ok_button, 'on_release'),
+                (ids.cancel_button, 'on_release'),
             )
-        if ad_event.is_fired or tasks[2].finished:
+        if ad_event.is_fired or index == 2:
             return None
         return ti.text
     finally:
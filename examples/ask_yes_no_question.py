@@ -39,9 +39,17 @@ Builder.load_string('''
 YesNoPopup = Factory.get('YesNoPopup')
 
 
+_popups: list[YesNoPopup] = []
+
+
+def prewarm(n=1):
+    '''Creates ``n`` popups ahead of time so that :func:`ask_yes_no_question` doesn't have to build one on first use.'''
+    _popups.extend(YesNoPopup() for __ in range(n - len(_popups)))
+
+
 async def ask_yes_no_question(
     question: str, *, window: WindowBase=Window, yes_text='Yes', no_text='No',
-    transition: Transition=FadeTransition(), auto_dismiss=True, _cache=[],
+    transition: Transition=FadeTransition(), auto_dismiss=True, _cache=_popups,
 ) -> Awaitable[Literal['yes', 'no', None]]:
     '''
     Asks a yes/no question using a popup dialog.
@@ -35,9 +35,17 @@ Builder.load_string('''
 MessageBox = Factory.get('MessageBox')
 
 
+_popups: list[MessageBox] = []
+
+
+def prewarm(n=1):
+    '''Creates ``n`` popups ahead of time so that :func:`message_box` doesn't have to build one on first use.'''
+    _popups.extend(MessageBox() for __ in range(n - len(_popups)))
+
+
 async def message_box(
     message: str, *, window: WindowBase=Window, ok_text='OK',
-    transition: Transition=SlideTransition(), auto_dismiss=True, _cache=[],
+    transition: Transition=SlideTransition(), auto_dismiss=True, _cache=_popups,
 ) -> Awaitable[Literal[True, None]]:
     '''
     .. code-block::
@@ -51,11 +51,18 @@ class ProgressBarPopup(BoxLayout):
         ak.smooth_attr((self, 'goal_progress'), (self, 'progress'), min_diff=0.01)
 
 
+_popups: list[ProgressBarPopup] = []
+
+
+def prewarm(n=1):
+    '''Creates ``n`` popups ahead of time so that :func:`open_progress_bar_popup` doesn't have to build one on first use.'''
+    _popups.extend(ProgressBarPopup() for __ in range(n - len(_popups)))
+
 
 @asynccontextmanager
 async def open_progress_bar_popup(
     text: str, *, progress=0.,
-    window: WindowBase=Window, transition: Transition=FadeTransition(), _cache=[],
+    window: WindowBase=Window, transition: Transition=FadeTransition(), _cache=_popups,
 ) -> AsyncIterator[ProgressBarPopup]:
     '''
     .. code-block::
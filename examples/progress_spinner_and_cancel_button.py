@@ -1,11 +1,13 @@
 import itertools
+from math import sin, cos, tau
 from contextlib import asynccontextmanager
 from collections.abc import AsyncIterator
-from kivy.graphics import Line, Color, InstructionGroup
+from kivy.graphics import Mesh, Color, RenderContext
 
 from kivy.core.window import Window, WindowBase
 from kivy.lang import Builder
 from kivy.factory import Factory
+from kivy.uix.widget import Widget
 
 
 import asynckivy as ak
@@ -40,36 +42,120 @@ Builder.load_string('''
 ProgressSpinnerPopup = Factory.get('ProgressSpinnerPopup')
 
 
+# Only the part of the ring between 'arc_start' and 'arc_start + arc_length' (both in turns, 0 is at 12 o'clock,
+# increasing clockwise) is drawn.
+fs_arc = '''
+$HEADER$
+
+uniform float arc_start;
+uniform float arc_length;
+
+void main (void){
+    if (fract(tex_coord0.x - arc_start) > arc_length)
+        discard;
+    gl_FragColor = frag_color;
+}
+'''
+
+
+N_RING_SEGMENTS = 128
+
+# (u, sin, cos) for each vertex around the ring, shared by every spinner regardless of its size.
+_UNIT_RING = tuple(
+    (u, sin(u * tau), cos(u * tau))
+    for u in (i / N_RING_SEGMENTS for i in range(N_RING_SEGMENTS + 1))
+)
+_RING_INDICES = list(range(N_RING_SEGMENTS * 2 + 2))
+
+
+def _ring_vertices(center, radius, line_width) -> list[float]:
+    '''
+    The vertices of a ring, each carrying its position along the circumference (in turns) as the u texture coordinate.
+    '''
+    cx, cy = center
+    r_outer = radius + line_width
+    r_inner = radius - line_width
+    vertices = []
+    for u, s, c in _UNIT_RING:
+        vertices.extend((cx + s * r_outer, cy + c * r_outer, u, 0., cx + s * r_inner, cy + c * r_inner, u, 1., ))
+    return vertices
+
+
+def _effective_opacity(widget: Widget) -> float:
+    '''(internal) The opacity the widget is actually drawn with, which includes the opacity of its ancestors.'''
+    opacity = 1.
+    while isinstance(widget, Widget):
+        opacity *= widget.opacity
+        widget = widget.parent
+    return opacity
+
+
 async def progress_spinner(
-        *, draw_target: InstructionGroup, center, radius, line_width=3, color=(1, 1, 1, 1, ), min_arc_angle=40,
-        speed=1.0):
+        *, area: Widget, line_width=3, color=(1, 1, 1, 1, ), min_arc_angle=40, speed=1.0):
+    '''
+    Draws a spinner that fills a relative-type widget, and keeps it filling the widget when the widget is resized.
+
+    The spinner is drawn in a RenderContext of its own, which doesn't inherit the opacity of the widgets it is drawn
+    in, so it copies theirs every frame.
+    '''
 
     BS = 40.0  # base speed (in degrees)
     AS = 360.0 - min_arc_angle * 2
-    get_next_start = itertools.accumulate(itertools.cycle((BS, BS, BS + AS, BS, )), initial=0).__next__
-    get_next_stop = itertools.accumulate(itertools.cycle((BS + AS, BS, BS, BS, )), initial=min_arc_angle).__next__
+    # How far the start and stop angles advance during each of the four segments that repeat forever.
+    segments = ((BS, BS + AS), (BS, BS), (BS + AS, BS), (BS, BS), )
     duration = 0.4 / speed
-    cur_start = get_next_start()
-    cur_stop = get_next_stop()
-    draw_target.add(color_inst := Color(*color))
-    draw_target.add(line_inst := Line(width=line_width))
+    start = 0.
+    stop = float(min_arc_angle)
+    # The ring is rebuilt only when the area is resized. On each frame only uniforms change, so nothing gets
+    # re-tessellated.
+    rc = RenderContext(fs=fs_arc, use_parent_projection=True, use_parent_modelview=True)
+    if not rc.shader.success:
+        raise Exception(f"Failed to set shader.")
+    rc.add(Color(*color))
+    rc.add(mesh := Mesh(indices=_RING_INDICES, mode='triangle_strip'))
+
+    def update_geometry(area, size):
+        w, h = size
+        mesh.vertices = _ring_vertices((w / 2., h / 2.), min(w, h) / 2., line_width)
+
+    update_geometry(area, area.size)
+    bind_id = area.fbind('size', update_geometry)
+    area.canvas.add(rc)
     try:
-        line_inst.circle = (*center, radius, cur_start, cur_stop)
-        while True:
-            next_start = get_next_start()
-            next_stop = get_next_stop()
-            async for start, stop in ak.interpolate_seq((cur_start, cur_stop), (next_start, next_stop), duration=duration):
-                line_inst.circle = (*center, radius, start, stop)
-            cur_start = next_start
-            cur_stop = next_stop
+        et = 0.  # elapsed time within the current segment
+        async with ak.sleep_freq() as sleep:
+            for d_start, d_stop in itertools.cycle(segments):
+                while et < duration:
+                    rc['opacity'] = _effective_opacity(area)
+                    p = et / duration
+                    cur_start = start + d_start * p
+                    rc['arc_start'] = cur_start / 360.
+                    rc['arc_length'] = (stop + d_stop * p - cur_start) / 360.
+                    et += await sleep()
+                et -= duration
+                start += d_start
+                stop += d_stop
+                if start >= 360.:
+                    # Only the angles modulo 360 matter. Keeping them small prevents them from losing precision
+                    # when the spinner runs for a long time.
+                    start -= 360.
+                    stop -= 360.
     finally:
-        draw_target.remove(line_inst)
-        draw_target.remove(color_inst)
+        area.canvas.remove(rc)
+        area.unbind_uid('size', bind_id)
+
+
+_popups: list[ProgressSpinnerPopup] = []
+
+
+def prewarm(n=1):
+    '''Creates ``n`` popups ahead of time so that :func:`open_progress_spinner_popup` doesn't have to build one on first use.'''
+    _popups.extend(ProgressSpinnerPopup() for __ in range(n - len(_popups)))
 
 
 @asynccontextmanager
 async def open_progress_spinner_popup(
-    text: str, *, window: WindowBase=Window, transition: Transition=SlideTransition(), _cache=[],
+    text: str, *, window: WindowBase=Window, transition: Transition=SlideTransition(), _cache=_popups,
 ) -> AsyncIterator[ProgressSpinnerPopup]:
     '''
     .. code-block::
@@ -80,15 +166,10 @@ async def open_progress_spinner_popup(
     popup = _cache.pop() if _cache else ProgressSpinnerPopup()
     try:
         popup.ids.label.text = text
-        spinner_area = popup.ids.spinnner_area
         async with (
             open(popup, window=window, auto_dismiss=False, transition=transition),
             ak.move_on_when(ak.event(popup.ids.cancel_button, 'on_release')) as cancel_tracker,
-            ak.run_as_daemon(progress_spinner(
-                draw_target=spinner_area.canvas,
-                center=(spinner_area.width / 2, spinner_area.height / 2),
-                radius=min(spinner_area.size) / 2.,
-            )),
+            ak.run_as_daemon(progress_spinner(area=popup.ids.spinnner_area)),
         ):
             yield popup
     finally:
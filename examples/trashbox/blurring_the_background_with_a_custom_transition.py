@@ -8,136 +8,231 @@
 from contextlib import asynccontextmanager
 
 from kivy.graphics.texture import Texture
-from kivy.graphics import Rectangle, Color, Fbo
+from kivy.graphics import Fbo, Scale, ClearColor, ClearBuffers, Mesh
 from kivy.core.window import WindowBase
 from kivy.core.window import Window, WindowBase
 from kivy.uix.widget import Widget
 
-import asynckivy as ak
 from asynckivy import anim_attrs_abbr as anim_attrs
 
 
-def capture_screen(target: WindowBase=Window, *, fragment_shader: str=None) -> Texture:
+def _clear_fbo(fbo: Fbo):
+    fbo.bind()
+    fbo.clear_buffer()
+    fbo.release()
+
+
+def capture_screen(
+    target: WindowBase=Window, *, scale=1.0, fbo_cache: dict=None,
+) -> Texture:
+    '''
+    :param scale: The resolution of the resulting texture relative to the screen. Values below 1.0 make any
+                  subsequent full-screen pass cheaper, in proportion to the number of pixels.
+    :param fbo_cache: If given, the Fbo is stored in it and reused by later calls with the same arguments instead
+                      of being created every time. The returned texture then belongs to that Fbo and gets
+                      overwritten by the next such call.
+    '''
     w, h = target.system_size
-    fbo = Fbo(size=(int(w), int(h)), with_stencilbuffer=True, fs=fragment_shader, clear_color=target.clearcolor)
-    if not fbo.shader.success:
-        raise Exception(f"Failed to set shader.")
+    size = (int(w * scale), int(h * scale))
+    key = ('capture_screen', size, scale)
+    if fbo_cache is None or (fbo := fbo_cache.get(key)) is None:
+        fbo = Fbo(size=size, with_stencilbuffer=True)
+        fbo.add(Scale(scale, scale, 1.))
+        if fbo_cache is not None:
+            fbo_cache[key] = fbo
+    fbo.clear_color = target.clearcolor
+    _clear_fbo(fbo)
     fbo.add(target.canvas)
     fbo.draw()
     fbo.remove(target.canvas)
     return fbo.texture
 
 
-def apply_fragment_shader(target: Texture, fragment_shader: str) -> Texture:
+def _fullscreen_triangle(size) -> Mesh:
+    '''
+    A single triangle twice as wide and tall as ``size``, whose texture coordinates map ``size`` to the unit square.
+    The part outside the Fbo gets clipped, so it covers the Fbo with one draw of three vertices.
+    '''
+    w, h = size
+    return Mesh(
+        vertices=[0., 0., 0., 0., w * 2., 0., 2., 0., 0., h * 2., 0., 2., ],
+        indices=[0, 1, 2, ], mode='triangles',
+    )
+
+
+def kawase_blur(target: Texture, offsets, *, fbo_cache: dict=None) -> Texture:
     '''
-    Applies a fragment shader to a texture and returns the result as a new texture.
+    Blurs a texture by running the Kawase kernel once per item of ``offsets``, ping-ponging between two Fbos.
+
+    :param fbo_cache: Same as :func:`capture_screen`'s.
     '''
     w, h = target.size
-    fbo = Fbo(size=(int(w), int(h)), with_stencilbuffer=True, fs=fragment_shader)
-    if not fbo.shader.success:
-        raise Exception(f"Failed to set shader.")
-    with fbo:
-        Color()
-        Rectangle(texture=target, pos=(0, 0), size=(w, h))
-    fbo.draw()
-    return fbo.texture
+    size = (int(w), int(h))
+    key = ('kawase_blur', size)
+    if fbo_cache is None or (passes := fbo_cache.get(key)) is None:
+        passes = []
+        for __ in range(2):
+            fbo = Fbo(size=size, vs=vs_kawase_blur, fs=fs_kawase_blur)
+            if not fbo.shader.success:
+                raise Exception(f"Failed to set shader.")
+            with fbo:
+                ClearColor(0, 0, 0, 0)
+                ClearBuffers()
+                mesh = _fullscreen_triangle(size)
+            passes.append((fbo, mesh))
+        if fbo_cache is not None:
+            fbo_cache[key] = passes
+    ping, pong = passes
+    for o in offsets:
+        fbo, mesh = ping
+        fbo['offset'] = ((o + .5) / w, (o + .5) / h)
+        mesh.texture = target
+        fbo.draw()
+        target = fbo.texture
+        ping, pong = pong, ping
+    return target
+
+
+# (width of the roughly equivalent Gaussian kernel in texels, offsets of the Kawase passes)
+KAWASE_KERNELS = (
+    (7, (0, 1, )),
+    (15, (0, 1, 2, )),
+    (23, (0, 1, 2, 2, )),
+    (35, (0, 1, 2, 2, 3, )),
+    (63, (0, 1, 2, 3, 4, 4, 5, )),
+)
+
+
+def kawase_offsets(kernel_width) -> tuple[int]:
+    '''
+    Returns the offsets of the smallest Kawase kernel that is at least as wide as the given Gaussian kernel.
+    '''
+    for width, offsets in KAWASE_KERNELS:
+        if width >= kernel_width:
+            return offsets
+    return offsets
 
 
 class BlurTransition:
-    def __init__(self, *, in_duration=.1, out_duration=.1, blur_size=24.0):
+    '''
+    :param scale: The resolution at which the blur is computed, relative to the screen. The result is low-frequency
+                  anyway, so it can be computed at a fraction of the resolution and stretched back with bilinear
+                  filtering.
+    :param reuse_background: Whether a popup may reuse the blurred background of the previous one instead of
+                             capturing the screen again. This saves the capture and the blur, but any change to the
+                             scene behind a popup *while it is open* goes unnoticed, so the next popup may show a
+                             stale background. Changes made after a popup is dismissed are noticed, except for those
+                             made in the very same frame it disappears, for which you have to call :meth:`invalidate`.
+                             Popups opened while another one using this transition is open always capture the screen.
+    '''
+    def __init__(self, *, in_duration=.1, out_duration=.1, blur_size=24.0, scale=0.25, reuse_background=False):
         self.in_duration = in_duration
         self.out_duration = out_duration
         self.blur_size = blur_size
+        self.scale = scale
+        self.reuse_background = reuse_background
+        self._n_open = 0  # number of popups currently open with this transition
+        self._cached: tuple[tuple, Texture] | None = None
+        self._fbo_cache = (None, {})  # (window size, cache)
+        self._n_draws_to_skip = 0
+
+    def invalidate(self, *args):
+        '''Discards the cached background so that the next popup re-captures the screen.'''
+        self._cached = None
+
+    def _on_draw(self, window):
+        # 'on_draw' is only dispatched on frames where the window's canvas actually needs redrawing, so it tells
+        # whether the scene changed. A Callback instruction in 'window.canvas.after' would tell the same, but it
+        # would also run when capture_screen() draws the window's canvas into an Fbo, marking the scene dirty by
+        # capturing it.
+        if self._n_draws_to_skip:
+            self._n_draws_to_skip -= 1
+            return
+        window.funbind('on_draw', self._on_draw)
+        self._cached = None
+
+    def _blur_screen(self, window: WindowBase, *, nested=False) -> Texture:
+        if nested:
+            # The Fbos in the cache hold the background of a popup that is still on screen.
+            fbo_cache = None
+        else:
+            size = tuple(window.system_size)
+            cached_size, fbo_cache = self._fbo_cache
+            if cached_size != size:
+                # Fbos of the previous window size would never be used again
+                self._fbo_cache = (size, fbo_cache := {})
+        screen = capture_screen(window, scale=self.scale, fbo_cache=fbo_cache)
+        # 'blur_size' is the radius in screen pixels, the kernel width is in texels of the downsampled screen.
+        return kawase_blur(screen, kawase_offsets(self.blur_size * self.scale * 2. + 1.), fbo_cache=fbo_cache)
 
     @asynccontextmanager
     async def __call__(self, popup: Widget, parent, window: WindowBase):
         bg_canvas = parent.canvas.before
+        nested = self._n_open > 0
+        # Whether this popup takes part in the reuse of backgrounds. An inner popup's background contains the outer
+        # popup, so it must neither reuse the outer one's background nor be reused once the outer one is gone.
+        reuse = self.reuse_background and not nested
+        if reuse:
+            window.funbind('on_draw', self._on_draw)
+        self._n_open += 1
         try:
             parent.opacity = 0
-            dt = self.blur_size / 4.0 / parent.width
-            blurred_screen = capture_screen(window, fragment_shader=fs_horizontal_blur.format(dt))
-            dt = self.blur_size / 4.0 / parent.height
-            blurred_screen = apply_fragment_shader(blurred_screen, fs_vertical_blur.format(dt))
-            with bg_canvas:
-                Color()
-                rect = Rectangle(texture=blurred_screen)
-            with ak.sync_attr((parent, 'size'), (rect, 'size')):
-                await anim_attrs(parent, d=self.in_duration, opacity=1.0)
-                yield
-                await anim_attrs(parent, d=self.out_duration, opacity=0.0)
+            key = (tuple(window.system_size), self.blur_size, self.scale)
+            cached = self._cached
+            if reuse and cached is not None and cached[0] == key:
+                blurred_screen = cached[1]
+            else:
+                blurred_screen = self._blur_screen(window, nested=nested)
+                self._cached = (key, blurred_screen) if reuse else None
+            # The parent's own background rectangle already follows its size, so it is borrowed for the blurred
+            # screen instead of drawing and resizing another one.
+            parent.bg_color.rgba = (1., 1., 1., 1.)
+            parent.bg_rect.texture = blurred_screen
+            bg_canvas.add(parent.bg_group)
+            await anim_attrs(parent, d=self.in_duration, opacity=1.0)
+            yield
+            await anim_attrs(parent, d=self.out_duration, opacity=0.0)
         finally:
+            self._n_open -= 1
             parent.opacity = 1.0
             bg_canvas.clear()
+            parent.bg_rect.texture = None  # The parent is reused by other transitions.
+            if reuse:
+                self._n_draws_to_skip = 1
+                window.fbind('on_draw', self._on_draw)
 
 
-fs_horizontal_blur = '''
+# The sampling coordinates are computed per vertex and interpolated, so the fragment shader does no coordinate math.
+vs_kawase_blur = '''
 $HEADER$
 
-vec4 effect(vec4 color, sampler2D texture, vec2 tex_coords)
-{{
-    float dt = {};
-    vec4 sum = vec4(0.0);
-    sum += texture2D(texture, vec2(tex_coords.x - 4.0*dt, tex_coords.y))
-                     * 0.077;
-    sum += texture2D(texture, vec2(tex_coords.x - 3.0*dt, tex_coords.y))
-                     * 0.077;
-    sum += texture2D(texture, vec2(tex_coords.x - 2.0*dt, tex_coords.y))
-                     * 0.077;
-    sum += texture2D(texture, vec2(tex_coords.x - dt, tex_coords.y))
-                     * 0.077;
-    sum += texture2D(texture, vec2(tex_coords.x, tex_coords.y))
-                     * 0.077;
-    sum += texture2D(texture, vec2(tex_coords.x + dt, tex_coords.y))
-                     * 0.077;
-    sum += texture2D(texture, vec2(tex_coords.x + 2.0*dt, tex_coords.y))
-                     * 0.077;
-    sum += texture2D(texture, vec2(tex_coords.x + 3.0*dt, tex_coords.y))
-                     * 0.077;
-    sum += texture2D(texture, vec2(tex_coords.x + 4.0*dt, tex_coords.y))
-                     * 0.077;
-    return vec4(sum.xyz, color.w);
-}}
-
-void main (void){{
-    vec4 normal_color = frag_color * texture2D(texture0, tex_coord0);
-    vec4 effect_color = effect(normal_color, texture0, tex_coord0);
-    gl_FragColor = effect_color;
-}}
+uniform vec2 offset;
+varying vec2 v_off[4];
+
+void main (void){
+    frag_color = color * vec4(1.0, 1.0, 1.0, opacity);
+    tex_coord0 = vTexCoords0;
+    v_off[0] = vTexCoords0 + vec2(-offset.x, -offset.y);
+    v_off[1] = vTexCoords0 + vec2(offset.x, -offset.y);
+    v_off[2] = vTexCoords0 + vec2(-offset.x, offset.y);
+    v_off[3] = vTexCoords0 + vec2(offset.x, offset.y);
+    gl_Position = projection_mat * modelview_mat * vec4(vPosition.xy, 0.0, 1.0);
+}
 '''
 
-fs_vertical_blur = '''
+# Each fetch lands on the corner shared by 4 texels, so bilinear filtering averages 16 texels in 4 fetches.
+fs_kawase_blur = '''
 $HEADER$
 
-vec4 effect(vec4 color, sampler2D texture, vec2 tex_coords)
-{{
-    float dt = {};
-    vec4 sum = vec4(0.0);
-    sum += texture2D(texture, vec2(tex_coords.x, tex_coords.y - 4.0*dt))
-                     * 0.077;
-    sum += texture2D(texture, vec2(tex_coords.x, tex_coords.y - 3.0*dt))
-                     * 0.077;
-    sum += texture2D(texture, vec2(tex_coords.x, tex_coords.y - 2.0*dt))
-                     * 0.077;
-    sum += texture2D(texture, vec2(tex_coords.x, tex_coords.y - dt))
-                     * 0.077;
-    sum += texture2D(texture, vec2(tex_coords.x, tex_coords.y))
-                     * 0.077;
-    sum += texture2D(texture, vec2(tex_coords.x, tex_coords.y + dt))
-                     * 0.077;
-    sum += texture2D(texture, vec2(tex_coords.x, tex_coords.y + 2.0*dt))
-                     * 0.077;
-    sum += texture2D(texture, vec2(tex_coords.x, tex_coords.y + 3.0*dt))
-                     * 0.077;
-    sum += texture2D(texture, vec2(tex_coords.x, tex_coords.y + 4.0*dt))
-                     * 0.077;
-    return vec4(sum.xyz, color.w);
-}}
-
-void main (void){{
-    vec4 normal_color = frag_color * texture2D(texture0, tex_coord0);
-    vec4 effect_color = effect(normal_color, texture0, tex_coord0);
-    gl_FragColor = effect_color;
-}}
+varying vec2 v_off[4];
+
+void main (void){
+    vec4 sum = texture2D(texture0, v_off[0]);
+    sum += texture2D(texture0, v_off[1]);
+    sum += texture2D(texture0, v_off[2]);
+    sum += texture2D(texture0, v_off[3]);
+    gl_FragColor = frag_color * (sum * 0.25);
+}
 '''
 
 
@@ -171,8 +266,9 @@ def main():
                 "Do you like Kivy?",
                 "Do you like AsyncKivy?",
             ]
+            transition = BlurTransition(blur_size=32.0, reuse_background=True)
             for q in questions:
-                answer = await ask_yes_no_question(q, transition=BlurTransition(blur_size=32.0))
+                answer = await ask_yes_no_question(q, transition=transition)
                 if answer is None:
                     answer = '<Unanswered>'
                 print(q, '->', answer)
@@ -1,20 +1,20 @@
 __all__ = (
-    'open', 'Transition', 'no_transition', 'FadeTransition', 'SlideTransition',
+    'open', 'prewarm', 'Transition', 'no_transition', 'FadeTransition', 'SlideTransition',
 )
 
 from typing import TypeAlias, Literal
-from functools import partial
+from collections import deque
 from collections.abc import Callable, AsyncIterator
-from contextlib import AsyncExitStack, contextmanager, asynccontextmanager, AbstractAsyncContextManager
+from contextlib import contextmanager, asynccontextmanager, AbstractAsyncContextManager
 
-from kivy.graphics import Translate, Rectangle, Color
+from kivy.animation import AnimationTransition
+from kivy.graphics import Translate, Rectangle, Color, InstructionGroup
 from kivy.core.window import Window, WindowBase
 from kivy.uix.widget import Widget
 from kivy.uix.floatlayout import FloatLayout
 
 
 import asynckivy as ak
-from asynckivy import anim_attrs_abbr as anim_attrs
 
 
 DARK = (0., 0., 0., .8)
@@ -24,13 +24,46 @@ Defines how a popup appears and disappears.
 '''
 
 
+# https://github.com/kivy/kivy/issues/9075
+_DISMISSAL_KEYS = {
+    27: 'escape_key',
+    1073742106: 'back_button',
+}
+
+
 class KXPopupParent(FloatLayout):
     '''(internal)'''
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self._block_inputs = True
+        self._popup: Widget | None = None
+        self._bbox_collision = True
         self.dismiss: Callable | None = None
 
+        # The background instructions live as long as the parent, which is pooled, so that transitions don't have to
+        # create them on every popup. Transitions add 'bg_group' to 'canvas.before' and remove it when they are done.
+        self.bg_color = Color()
+        self.bg_rect = Rectangle(size=self.size)
+        self.bg_group = InstructionGroup()  # so that drawing the background is a single canvas change
+        self.bg_group.add(self.bg_color)
+        self.bg_group.add(self.bg_rect)
+        self.fbind('size', self._update_bg_rect_size)
+
+    def _update_bg_rect_size(self, __, size):
+        self.bg_rect.size = size
+
+    def add_widget(self, widget, *args, **kwargs):
+        super().add_widget(widget, *args, **kwargs)
+        self._popup = widget
+        # Whether the popup's collision test can be inlined into the touch handlers, which holds unless the popup
+        # overrides collide_point().
+        self._bbox_collision = type(widget).collide_point is Widget.collide_point
+
+    def remove_widget(self, widget, *args, **kwargs):
+        super().remove_widget(widget, *args, **kwargs)
+        if widget is self._popup:
+            self._popup = None
+
     @contextmanager
     def accept_inputs(self):
         self._block_inputs = False
@@ -39,11 +72,18 @@ class KXPopupParent(FloatLayout):
         finally:
             self._block_inputs = True
 
+    def _on_keyboard(self, window, key, *args, _causes=_DISMISSAL_KEYS):
+        if (cause := _causes.get(key)) is not None:
+            self.dismiss(cause=cause)
+            return True
+
     def on_touch_down(self, touch):
         if self._block_inputs:
             return True
-        c = self.children[0]
-        if c.collide_point(*touch.opos):  # FloatLayout is not a relative-type widget, no need for translation
+        c = self._popup
+        x, y = touch.opos
+        # FloatLayout is not a relative-type widget, no need for translation
+        if (c.x <= x <= c.right and c.y <= y <= c.top) if self._bbox_collision else c.collide_point(x, y):
             c.dispatch('on_touch_down', touch)
         elif (f := self.dismiss) is not None:
             f(cause='outside_touch')
@@ -52,53 +92,101 @@ class KXPopupParent(FloatLayout):
     def on_touch_move(self, touch):
         if self._block_inputs:
             return True
-        c = self.children[0]
-        if c.collide_point(*touch.pos):
+        c = self._popup
+        x, y = touch.pos
+        if (c.x <= x <= c.right and c.y <= y <= c.top) if self._bbox_collision else c.collide_point(x, y):
             c.dispatch('on_touch_move', touch)
         return True
 
     def on_touch_up(self, touch):
         if self._block_inputs:
             return True
-        c = self.children[0]
-        if c.collide_point(*touch.pos):
+        c = self._popup
+        x, y = touch.pos
+        if (c.x <= x <= c.right and c.y <= y <= c.top) if self._bbox_collision else c.collide_point(x, y):
             c.dispatch('on_touch_up', touch)
         return True
 
 
+def _draw_bg(parent: KXPopupParent, rgba) -> Color:
+    '''(internal)'''
+    color = parent.bg_color
+    color.rgba = rgba
+    parent.canvas.before.add(parent.bg_group)
+    return color
+
+
+async def _fade(widget: Widget, duration, end):
+    '''(internal) Linearly changes the opacity of the widget.'''
+    if duration:
+        start = widget.opacity
+        slope = end - start
+        et = 0.  # elapsed time
+        async with ak.sleep_freq() as sleep:
+            while (et := et + await sleep()) < duration:
+                widget.opacity = start + slope * (et / duration)
+    widget.opacity = end
+
+
 @asynccontextmanager
 async def no_transition(popup: Widget, parent: KXPopupParent, window: WindowBase):
     yield
 
 
 class FadeTransition:
+    '''
+    :param background_color: A fully transparent color, such as ``(0, 0, 0, 0)``, draws no background at all.
+    '''
     def __init__(self, *, in_duration=.1, out_duration=.1, background_color=DARK):
         self.in_duration = in_duration
         self.out_duration = out_duration
         self.background_color = background_color
 
+    @property
+    def background_color(self):
+        return self._background_color
+
+    @background_color.setter
+    def background_color(self, color):
+        # An RGB color is accepted as well, and is treated as fully opaque.
+        self._background_color = (*color, 1.)[:4]
+
     @asynccontextmanager
     async def __call__(self, popup: Widget, parent: KXPopupParent, window: WindowBase):
         bg_canvas = parent.canvas.before
         try:
             parent.opacity = 0
             await ak.sleep(0)
-            with bg_canvas:
-                Color(*self.background_color)
-                rect = Rectangle()
-            with ak.sync_attr((parent, 'size'), (rect, 'size')):
-                await anim_attrs(parent, d=self.in_duration, opacity=1.0)
-                yield
-                await anim_attrs(parent, d=self.out_duration, opacity=0.0)
+            if self.background_color[3]:
+                _draw_bg(parent, self.background_color)
+            await _fade(parent, self.in_duration, 1.0)
+            yield
+            await _fade(parent, self.out_duration, 0.0)
         finally:
             bg_canvas.clear()
 
 
+def _resolve_curve(curve) -> Callable[[float], float]:
+    '''(internal)'''
+    return getattr(AnimationTransition, curve) if isinstance(curve, str) else curve
+
+
+# in_direction -> how far the popup has to be moved to be outside the parent
+_SLIDE_DISTANCES = {
+    'down': lambda parent, popup: (0., parent.height - popup.y),
+    'up': lambda parent, popup: (0., -popup.top),
+    'left': lambda parent, popup: (parent.width - popup.x, 0.),
+    'right': lambda parent, popup: (-popup.right, 0.),
+}
+
+
 class SlideTransition:
     '''
     Slides the popup in and out from a given direction.
 
     You cannot specify the out-direction, it is always the opposite of the in-direction.
+
+    :param background_color: Same as :class:`FadeTransition`'s.
     '''
     def __init__(self, *, in_duration=.2, out_duration=.2, background_color=DARK,
                  in_curve='out_back', out_curve='in_back',
@@ -110,61 +198,110 @@ class SlideTransition:
         self.out_curve = out_curve
         self.in_direction = in_direction
 
+    @property
+    def background_color(self):
+        return self._background_color
+
+    @background_color.setter
+    def background_color(self, color):
+        self._background_color = color = tuple(color)
+        # The background fades in from its own color with zero alpha.
+        self._bg_start = (*color[:3], 0.)
+        self._bg_alpha = color[3]
+
+    # Curves given by name are resolved when they are set rather than every time the popup moves.
+    @property
+    def in_curve(self):
+        return self._in_curve
+
+    @in_curve.setter
+    def in_curve(self, curve):
+        self._in_curve = curve
+        self._in_curve_func = _resolve_curve(curve)
+
+    @property
+    def out_curve(self):
+        return self._out_curve
+
+    @out_curve.setter
+    def out_curve(self, curve):
+        self._out_curve = curve
+        self._out_curve_func = _resolve_curve(curve)
+
+    @property
+    def in_direction(self) -> Literal['left', 'right', 'down', 'up']:
+        return self._in_direction
+
+    @in_direction.setter
+    def in_direction(self, in_direction):
+        try:
+            self._distance = _SLIDE_DISTANCES[in_direction]
+        except KeyError:
+            raise ValueError(f'Invalid in_direction: {in_direction}') from None
+        self._in_direction = in_direction
+
+    @staticmethod
+    async def _animate(mat: Translate, color: Color | None, duration, curve, x, y, bg_alpha):
+        '''(internal) Moves the popup and changes the background's alpha in a single frame loop.'''
+        if duration:
+            x0, y0 = mat.xy
+            dx = x - x0
+            dy = y - y0
+            a0 = 0. if color is None else color.a
+            da = bg_alpha - a0
+            et = 0.  # elapsed time
+            async with ak.sleep_freq() as sleep:
+                while (et := et + await sleep()) < duration:
+                    p = et / duration
+                    t = curve(p)
+                    mat.xy = (x0 + dx * t, y0 + dy * t)
+                    if color is not None:
+                        color.a = a0 + da * p
+        mat.xy = (x, y)
+        if color is not None:
+            color.a = bg_alpha
+
     @asynccontextmanager
     async def __call__(self, popup: Widget, parent: KXPopupParent, window: WindowBase):
         bg_canvas = parent.canvas.before
         parent.opacity = 0.
         await ak.sleep(0)
         try:
-            bg_alpha = self.background_color[3]
-            with bg_canvas:
-                color = Color(*self.background_color[:3], 0.)
-                rect = Rectangle()
-            with (
-                ak.sync_attr((parent, 'size'), (rect, 'size')),
-                ak.transform(popup, use_outer_canvas=True) as ig,
-            ):
-                x_dist = y_dist = 0.
-                match self.in_direction:
-                    case 'down':
-                        y_dist = parent.height - popup.y
-                    case 'up':
-                        y_dist = -popup.top
-                    case 'left':
-                        x_dist = parent.width - popup.x
-                    case 'right':
-                        x_dist = -popup.right
-                    case _:
-                        raise ValueError(f'Invalid in_direction: {self.in_direction}')
+            bg_alpha = self._bg_alpha
+            color = _draw_bg(parent, self._bg_start) if bg_alpha else None
+            with ak.transform(popup, use_outer_canvas=True) as ig:
+                x_dist, y_dist = self._distance(parent, popup)
                 ig.add(mat := Translate(x_dist, y_dist))
                 parent.opacity = 1.
-                await ak.wait_all(
-                    anim_attrs(mat, d=self.in_duration, t=self.in_curve, x=0, y=0),
-                    anim_attrs(color, d=self.in_duration, a=bg_alpha),
-                )
+                await self._animate(mat, color, self.in_duration, self._in_curve_func, 0., 0., bg_alpha)
                 yield
-                await ak.wait_all(
-                    anim_attrs(mat, d=self.out_duration, t=self.out_curve, x=x_dist, y=y_dist),
-                    anim_attrs(color, d=self.out_duration, a=0.),
-                )
+                await self._animate(mat, color, self.out_duration, self._out_curve_func, x_dist, y_dist, 0.)
         finally:
             bg_canvas.clear()
 
 
-def _dismiss_when_escape_key_or_back_button_is_pressed(dismiss, window, key, *args):
-    # https://github.com/kivy/kivy/issues/9075
-    if key == 27:
-        dismiss(cause='escape_key')
-        return True
-    elif key == 1073742106:
-        dismiss(cause='back_button')
-        return True
+# Parents returned to a full pool push out the least recently used one, so at most this many are kept for reuse.
+_parents: deque[KXPopupParent] = deque(maxlen=4)
+
+
+def prewarm(n=1):
+    '''
+    Creates the internal widgets :func:`open` needs ahead of time, so that the first ``n`` popups that are open at
+    the same time don't pay for their construction. At most 4 sets are kept, larger values of ``n`` are clamped.
+
+    .. code-block::
+
+        class MyApp(App):
+            def on_start(self):
+                Clock.schedule_once(lambda dt: popup.prewarm(2), .5)
+    '''
+    _parents.extend(KXPopupParent() for __ in range(min(n, _parents.maxlen) - len(_parents)))
 
 
 @asynccontextmanager
 async def open(
     popup: Widget, *, window: WindowBase=Window, auto_dismiss=True,
-    transition: Transition=FadeTransition(), _cache: list[KXPopupParent]=[],
+    transition: Transition=FadeTransition(), _cache: deque[KXPopupParent]=_parents,
 ) -> AsyncIterator[ak.StatefulEvent]:
     '''
     Returns an async context manager that opens a popup.
@@ -187,20 +324,29 @@ async def open(
             # 'outside_touch', 'escape_key' or 'back_button'
             cause_of_dismissal = auto_dismiss_event.params[1]['cause']
     '''
-    async with AsyncExitStack() as stack:
-        defer = stack.callback  # Because it works like the defer keyword from other languages.
-
-        parent = _cache.pop() if _cache else KXPopupParent(); defer(_cache.append, parent)
+    parent = _cache.pop() if _cache else KXPopupParent()
+    try:
         parent.dismiss = None
-        parent.add_widget(popup); defer(parent.remove_widget, popup)
-        window.add_widget(parent); defer(window.remove_widget, parent)
-
-        await stack.enter_async_context(transition(popup, parent, window))
-        ad_event = ak.StatefulEvent()  # 'ad' stands for 'auto dismiss'
-        if auto_dismiss:
-            bind_id = window.fbind("on_keyboard", partial(_dismiss_when_escape_key_or_back_button_is_pressed, ad_event.fire))
-            defer(window.unbind_uid, "on_keyboard", bind_id)
-            parent.dismiss = ad_event.fire
-            await stack.enter_async_context(ak.move_on_when(ad_event.wait()))
-        with parent.accept_inputs():
-            yield ad_event
+        parent.add_widget(popup)
+        window.add_widget(parent)
+        async with transition(popup, parent, window):
+            ad_event = ak.StatefulEvent()  # 'ad' stands for 'auto dismiss'
+            if auto_dismiss:
+                parent.dismiss = ad_event.fire
+                # Bound on every open, rather than once per parent, so that the most recently opened popup
+                # is the first to receive the key.
+                bind_id = window.fbind("on_keyboard", parent._on_keyboard)
+                try:
+                    async with ak.move_on_when(ad_event.wait()):
+                        with parent.accept_inputs():
+                            yield ad_event
+                finally:
+                    window.unbind_uid("on_keyboard", bind_id)
+            else:
+                with parent.accept_inputs():
+                    yield ad_event
+    finally:
+        # Both remove_widget() calls do nothing if the corresponding add_widget() call didn't happen.
+        window.remove_widget(parent)
+        parent.remove_widget(popup)
+        _cache.append(parent)